@@ -4,13 +4,41 @@ import os
 # Get the absolute path to the project root directory
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-# Load token from token.txt file
-with open(os.path.join(BASE_DIR, "token.txt"), "r") as file:
-    TOKEN = file.read().strip()
+
+def _read_token_file() -> str:
+    """Read the bot token from token.txt in the project root."""
+    with open(os.path.join(BASE_DIR, "token.txt"), "r") as file:
+        return file.read().strip()
+
+
+# Take the token from TELEGRAM_TOKEN, falling back to the token.txt file
+TOKEN = os.environ.get("TELEGRAM_TOKEN") or _read_token_file()
 
 # Path to the food list file
-FOOD_LIST_PATH = "data/foods.txt"
+FOOD_LIST_PATH = os.environ.get("FOOD_LIST_PATH", "data/foods.txt")
 
 # Database configuration
-# For simplicity, we'll use a simple JSON file to store user debts
-DEBT_DB_PATH = "data/debts.json" 
\ No newline at end of file
+# User debts are stored in a SQLite database
+DEBT_DB_PATH = os.environ.get("DEBT_DB_PATH", "data/debts.db")
+# Legacy JSON debt file, imported into the database once on startup
+LEGACY_DEBT_JSON_PATH = os.environ.get("LEGACY_DEBT_JSON_PATH", "data/debts.json")
+
+# Update delivery mode: "polling" (default) or "webhook"
+BOT_MODE = os.environ.get("BOT_MODE", "polling").lower()
+
+# Webhook configuration (only used when BOT_MODE is "webhook")
+# WEBHOOK_URL is the public HTTPS base URL Telegram will POST updates to
+WEBHOOK_URL = os.environ.get("WEBHOOK_URL", "").rstrip("/")
+WEBHOOK_LISTEN = os.environ.get("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.environ.get("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.environ.get("WEBHOOK_PATH", "webhook").strip("/")
+# Telegram sends this in the X-Telegram-Bot-Api-Secret-Token header of every update;
+# required in webhook mode so the listener only accepts requests from Telegram
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET") or None
+
+# HTTP client used for Telegram Bot API calls
+# A larger pool lets concurrent replies reuse open connections instead of waiting
+HTTP_CONNECTION_POOL_SIZE = int(os.environ.get("HTTP_CONNECTION_POOL_SIZE", "64"))
+HTTP_VERSION = os.environ.get("HTTP_VERSION", "2")
+HTTP_CONNECT_TIMEOUT = 5.0
+HTTP_READ_TIMEOUT = 15.0
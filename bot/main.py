@@ -1,10 +1,13 @@
 #!/usr/bin/env python
+import asyncio
+import functools
 import logging
 import re
 import os
-from typing import Dict, List, Tuple, Optional
+from typing import Awaitable, Callable, Dict, List, Tuple, Optional
 
 from telegram import Update
+from telegram.request import HTTPXRequest
 from telegram.ext import (
     Application,
     CommandHandler,
@@ -13,16 +16,32 @@ from telegram.ext import (
     ContextTypes,
 )
 
-from config import TOKEN, FOOD_LIST_PATH, DEBT_DB_PATH
+from config import (
+    TOKEN,
+    FOOD_LIST_PATH,
+    DEBT_DB_PATH,
+    LEGACY_DEBT_JSON_PATH,
+    BOT_MODE,
+    WEBHOOK_URL,
+    WEBHOOK_LISTEN,
+    WEBHOOK_PORT,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    HTTP_CONNECTION_POOL_SIZE,
+    HTTP_VERSION,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+)
 from utils import (
     get_random_food,
-    add_debt,
+    add_debts_bulk,
     get_debt,
     clear_debt,
+    migrate_debts_from_json,
     clear_food_cache,
     add_food_to_list,
     remove_food_from_list,
-    get_all_foods,
+    get_foodlist_messages,
     is_restricted_user,
     check_command_restriction
 )
@@ -42,65 +61,70 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # Update paths to be absolute
 FOOD_LIST_PATH_ABS = os.path.join(BASE_DIR, FOOD_LIST_PATH)
 DEBT_DB_PATH_ABS = os.path.join(BASE_DIR, DEBT_DB_PATH)
+LEGACY_DEBT_JSON_PATH_ABS = os.path.join(BASE_DIR, LEGACY_DEBT_JSON_PATH)
+
+# List of commands shown by /start and /help
+HELP_TEXT = (
+    'Commands:\n'
+    '/food - Get a random food suggestion\n'
+    '/newfood - Force a new food suggestion\n'
+    '/clearfood - Clear current food suggestion\n'
+    '/addfood - Add a new food to the list\n'
+    '/removefood - Remove a food from the list\n'
+    '/foodlist - Show all foods in the list\n'
+    '/debt username - Check debt for a user\n'
+    '/done username - Clear debt for a user\n'
+    '/help - Show all available commands\n\n'
+    'You can also tag a user with an amount (e.g. @username 100) to add to their debt.'
+)
+
+# Pattern for debt messages: @username followed by a space and then a number
+DEBT_PATTERN = re.compile(r'@(\w+)\s+(-?\d+(?:\.\d+)?)')
+
+
+async def _restricted(update: Update) -> bool:
+    """Check if the sender is restricted, sending them the VIP message if they are."""
+    user = update.effective_user
+    # Check restriction only if username exists
+    return bool(user and user.username and await check_command_restriction(update, user.username))
+
+
+def restricted(handler: Callable[[Update, ContextTypes.DEFAULT_TYPE], Awaitable[None]]):
+    """Decorate a command handler so restricted users get the VIP message instead."""
+    @functools.wraps(handler)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        if await _restricted(update):
+            return
+        await handler(update, context)
+    return wrapper
 
+
+@restricted
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Send a message when the command /start is issued."""
-    # Debug information
-    logger.info(f"Start command triggered - update: {update}")
-    logger.info(f"Message from chat ID: {update.message.chat_id}")
-    logger.info(f"Message from user ID: {update.message.from_user.id}")
-    
     user = update.effective_user
-    logger.info(f"Effective user: {user}")
     
-    # Check if username exists and log it
-    if user:
-        logger.info(f"Username: {user.username}, First name: {user.first_name}")
+    # Debug information (lazily formatted, so it costs nothing unless DEBUG is on)
+    logger.debug("Start command from chat %s user %s (%s)",
+                 update.message.chat_id, user.id if user else None,
+                 user.username if user else None)
     
     # This is the key issue - let's check for None or empty username explicitly
     if user and not user.username:
         logger.warning("User has no username - cannot check restrictions")
     
-    # Check if the user is restricted - only check if user has a username
-    if user and user.username:
-        # Check restriction only if username exists
-        if await check_command_restriction(update, user.username):
-            return
-    
     await update.message.reply_text(
-        f'Hi {user.first_name}! I am your Food and Debt Tracker Bot.\n\n'
-        f'Commands:\n'
-        f'/food - Get a random food suggestion\n'
-        f'/newfood - Force a new food suggestion\n'
-        f'/clearfood - Clear current food suggestion\n'
-        f'/addfood - Add a new food to the list\n'
-        f'/removefood - Remove a food from the list\n'
-        f'/foodlist - Show all foods in the list\n'
-        f'/debt username - Check debt for a user\n'
-        f'/done username - Clear debt for a user\n'
-        f'/help - Show all available commands\n\n'
-        f'You can also tag a user with an amount (e.g. @username 100) to add to their debt.'
+        f'Hi {user.first_name}! I am your Food and Debt Tracker Bot.\n\n' + HELP_TEXT
     )
 
 
+@restricted
 async def food_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Send a random food suggestion when the command /food is issued."""
-    # Check if the user is restricted
     user = update.effective_user
-    logger.info(f"Food command called by user: {user}")
-    
-    if user:
-        logger.info(f"User ID: {user.id}, Username: {user.username}, First Name: {user.first_name}")
-    else:
-        logger.info("User object is None")
+    logger.debug("Food command from user %s (%s)",
+                 user.id if user else None, user.username if user else None)
     
-    # Check if the user is restricted - only check if user has a username
-    if user and user.username:
-        # Check restriction only if username exists
-        if await check_command_restriction(update, user.username):
-            return
-    
-    logger.info(f"Food list path: {FOOD_LIST_PATH_ABS}")
     food = get_random_food(FOOD_LIST_PATH_ABS)
     
     if food:
@@ -109,18 +133,9 @@ async def food_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         await update.message.reply_text('No foods available. Please import a food list first.')
 
 
+@restricted
 async def newfood_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Force a new random food suggestion when the command /newfood is issued."""
-    # Check if the user is restricted
-    user = update.effective_user
-    
-    # Check if the user is restricted - only check if user has a username
-    if user and user.username:
-        # Check restriction only if username exists
-        if await check_command_restriction(update, user.username):
-            return
-    
-    logger.info(f"Food list path: {FOOD_LIST_PATH_ABS}")
     food = get_random_food(FOOD_LIST_PATH_ABS, force_new=True)
     
     if food:
@@ -129,32 +144,16 @@ async def newfood_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await update.message.reply_text('No foods available. Please import a food list first.')
 
 
+@restricted
 async def clearfood_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Clear the current food suggestion when the command /clearfood is issued."""
-    # Check if the user is restricted
-    user = update.effective_user
-    
-    # Check if the user is restricted - only check if user has a username
-    if user and user.username:
-        # Check restriction only if username exists
-        if await check_command_restriction(update, user.username):
-            return
-    
     clear_food_cache()
     await update.message.reply_text('Food suggestion cleared! Use /food or /newfood to get a new suggestion.')
 
 
+@restricted
 async def addfood_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Add a new food to the food list when the command /addfood is issued."""
-    # Check if the user is restricted
-    user = update.effective_user
-    
-    # Check if the user is restricted - only check if user has a username
-    if user and user.username:
-        # Check restriction only if username exists
-        if await check_command_restriction(update, user.username):
-            return
-    
     # Check if a food item was provided
     if not context.args or len(context.args) < 1:
         await update.message.reply_text('Please specify a food to add, e.g. /addfood "Fried Rice"')
@@ -172,17 +171,9 @@ async def addfood_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await update.message.reply_text(f'"{food_item}" already exists in the food list or could not be added.')
 
 
+@restricted
 async def removefood_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Remove a food from the food list when the command /removefood is issued."""
-    # Check if the user is restricted
-    user = update.effective_user
-    
-    # Check if the user is restricted - only check if user has a username
-    if user and user.username:
-        # Check restriction only if username exists
-        if await check_command_restriction(update, user.username):
-            return
-    
     # Check if a food item was provided
     if not context.args or len(context.args) < 1:
         await update.message.reply_text('Please specify a food to remove, e.g. /removefood "Fried Rice"')
@@ -197,68 +188,24 @@ async def removefood_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     await update.message.reply_text(message)
 
 
+@restricted
 async def foodlist_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Show all foods in the list when the command /foodlist is issued."""
-    # Check if the user is restricted
-    user = update.effective_user
-    
-    # Check if the user is restricted - only check if user has a username
-    if user and user.username:
-        # Check restriction only if username exists
-        if await check_command_restriction(update, user.username):
-            return
-    
-    # Get all foods with numbered format
-    _, formatted_text = get_all_foods(FOOD_LIST_PATH_ABS, numbered=True)
-    
-    # Telegram has a message limit, so we might need to chunk it
-    if len(formatted_text) > 4000:
-        chunks = [formatted_text[i:i+4000] for i in range(0, len(formatted_text), 4000)]
-        for i, chunk in enumerate(chunks):
-            header = f"🍽️ Food List (Part {i+1}/{len(chunks)}):\n\n" if i == 0 else ""
-            await update.message.reply_text(f"{header}{chunk}")
-    else:
-        await update.message.reply_text(f"🍽️ Food List:\n\n{formatted_text}")
+    # The numbered list comes pre-chunked to fit Telegram's message limit
+    for message in get_foodlist_messages(FOOD_LIST_PATH_ABS):
+        await update.message.reply_text(message)
 
 
+@restricted
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Show help information when the command /help is issued."""
-    # Check if the user is restricted
-    user = update.effective_user
-    
-    # Check if the user is restricted - only check if user has a username
-    if user and user.username:
-        # Check restriction only if username exists
-        if await check_command_restriction(update, user.username):
-            return
-    
     # This is essentially the same as start but without the greeting
-    await update.message.reply_text(
-        f'Commands:\n'
-        f'/food - Get a random food suggestion\n'
-        f'/newfood - Force a new food suggestion\n'
-        f'/clearfood - Clear current food suggestion\n'
-        f'/addfood - Add a new food to the list\n'
-        f'/removefood - Remove a food from the list\n'
-        f'/foodlist - Show all foods in the list\n'
-        f'/debt username - Check debt for a user\n'
-        f'/done username - Clear debt for a user\n'
-        f'/help - Show all available commands\n\n'
-        f'You can also tag a user with an amount (e.g. @username 100) to add to their debt.'
-    )
+    await update.message.reply_text(HELP_TEXT)
 
 
+@restricted
 async def debt_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Show debt for a user when the command /debt is issued."""
-    # Check if the user is restricted
-    user = update.effective_user
-    
-    # Check if the user is restricted - only check if user has a username
-    if user and user.username:
-        # Check restriction only if username exists
-        if await check_command_restriction(update, user.username):
-            return
-    
     # Check if a username was provided
     if not context.args or len(context.args) < 1:
         await update.message.reply_text('Please specify a username, e.g. /debt username')
@@ -275,17 +222,9 @@ async def debt_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     await update.message.reply_text(f'@{username} has a debt of {debt:.2f}')
 
 
+@restricted
 async def done_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Clear debt for a user when the command /done is issued."""
-    # Check if the user is restricted
-    user = update.effective_user
-    
-    # Check if the user is restricted - only check if user has a username
-    if user and user.username:
-        # Check restriction only if username exists
-        if await check_command_restriction(update, user.username):
-            return
-    
     # Check if a username was provided
     if not context.args or len(context.args) < 1:
         await update.message.reply_text('Please specify a username, e.g. /done username')
@@ -313,16 +252,19 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     # Log message info
     user = update.effective_user
     if user:
-        logger.info(f"Regular message from user ID: {user.id}, Username: {user.username}, Text: {update.message.text[:20]}...")
+        logger.debug("Regular message from user ID: %s, Username: %s, Text: %.20s...",
+                     user.id, user.username, update.message.text)
     
     # We don't check general restriction for regular messages as users should be able to chat
     # But we do check if the user is restricted when they try to add debt
     text = update.message.text
     
+    # A debt message needs at least "@x 1"; skip the regex for everything else
+    if len(text) < 4 or '@' not in text:
+        return
+    
     # Look for pattern @username 100
-    # This matches @username followed by a space and then a number
-    pattern = r'@(\w+)\s+(-?\d+(\.\d+)?)'
-    matches = re.findall(pattern, text)
+    matches = DEBT_PATTERN.findall(text)
     
     if matches and user and user.username:
         # If the user is trying to add debt, check if they're restricted
@@ -331,16 +273,28 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             await update.message.reply_text("Bạn cần nạp VIP để thực hiện lệnh này")
             return
     
-    for match in matches:
-        username = match[0]
-        logger.info(f"Found debt message for username: {username}")
+    # Collect every debt in the message so they are saved in one go
+    updates: Dict[str, float] = {}
+    for username, amount_str in matches:
+        logger.debug("Found debt message for username: %s", username)
         try:
-            amount = float(match[1])
-            # Add to user's debt
-            new_total = add_debt(username, amount, DEBT_DB_PATH_ABS)
-            await update.message.reply_text(f'Added {amount:.2f} to @{username}\'s debt. New total: {new_total:.2f}')
+            amount = float(amount_str)
         except ValueError:
-            logger.warning(f"Could not convert {match[1]} to float")
+            logger.warning(f"Could not convert {amount_str} to float")
+            continue
+        updates[username] = updates.get(username, 0) + amount
+    
+    if not updates:
+        return
+    
+    # Add to users' debts
+    new_totals = add_debts_bulk(list(updates.items()), DEBT_DB_PATH_ABS)
+    
+    # Send all replies concurrently rather than one round-trip at a time
+    await asyncio.gather(*(
+        update.message.reply_text(f'Added {amount:.2f} to @{username}\'s debt. New total: {new_totals[username]:.2f}')
+        for username, amount in updates.items()
+    ))
 
 
 async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -350,22 +304,40 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         await update.message.reply_text('An error occurred while processing your request.')
 
 
+# Command name -> handler, registered in main()
+COMMAND_HANDLERS = {
+    "start": start,
+    "help": help_command,
+    "food": food_command,
+    "newfood": newfood_command,
+    "clearfood": clearfood_command,
+    "addfood": addfood_command,
+    "removefood": removefood_command,
+    "foodlist": foodlist_command,
+    "debt": debt_command,
+    "done": done_command,
+}
+
+
 def main() -> None:
     """Start the bot."""
+    # Import debts from the old JSON storage if it is still around
+    migrate_debts_from_json(LEGACY_DEBT_JSON_PATH_ABS, DEBT_DB_PATH_ABS)
+    
+    # Keep a pooled HTTP client so replies reuse TCP/TLS connections
+    request = HTTPXRequest(
+        connection_pool_size=HTTP_CONNECTION_POOL_SIZE,
+        http_version=HTTP_VERSION,
+        connect_timeout=HTTP_CONNECT_TIMEOUT,
+        read_timeout=HTTP_READ_TIMEOUT,
+    )
+    
     # Create the Application and pass it your bot's token
-    application = Application.builder().token(TOKEN).build()
+    application = Application.builder().token(TOKEN).request(request).build()
     
     # Register command handlers
-    application.add_handler(CommandHandler("start", start))
-    application.add_handler(CommandHandler("help", help_command))
-    application.add_handler(CommandHandler("food", food_command))
-    application.add_handler(CommandHandler("newfood", newfood_command))
-    application.add_handler(CommandHandler("clearfood", clearfood_command))
-    application.add_handler(CommandHandler("addfood", addfood_command))
-    application.add_handler(CommandHandler("removefood", removefood_command))
-    application.add_handler(CommandHandler("foodlist", foodlist_command))
-    application.add_handler(CommandHandler("debt", debt_command))
-    application.add_handler(CommandHandler("done", done_command))
+    for command, handler in COMMAND_HANDLERS.items():
+        application.add_handler(CommandHandler(command, handler))
     
     # Register message handler
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
@@ -374,7 +346,23 @@ def main() -> None:
     application.add_error_handler(error_handler)
     
     # Start the Bot
-    application.run_polling()
+    if BOT_MODE == "webhook":
+        if not WEBHOOK_URL:
+            raise RuntimeError("WEBHOOK_URL must be set when BOT_MODE is 'webhook'")
+        if not WEBHOOK_SECRET:
+            raise RuntimeError("WEBHOOK_SECRET must be set when BOT_MODE is 'webhook'")
+        # Telegram pushes updates to us; PTB rejects requests without the secret token
+        logger.info(f"Starting webhook on {WEBHOOK_LISTEN}:{WEBHOOK_PORT}/{WEBHOOK_PATH}")
+        application.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET,
+            webhook_url=f"{WEBHOOK_URL}/{WEBHOOK_PATH}",
+        )
+    else:
+        # Fall back to long polling
+        application.run_polling()
 
 
 if __name__ == '__main__':
@@ -1,18 +1,124 @@
-import json
+import mmap
 import os
 import random
+import re
 import logging
-from typing import Dict, List, Optional, Union, Tuple
-from datetime import datetime, timedelta
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional, Set, Union, Tuple
+from datetime import datetime
+from pathlib import Path
+
+# Prefer orjson for speed, but keep working with the standard library
+try:
+    import orjson
+
+    def _json_loads(data: bytes) -> Any:
+        return orjson.loads(data)
+
+    def _json_dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    import json
+
+    def _json_loads(data: bytes) -> Any:
+        return json.loads(data)
+
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj, indent=2).encode('utf-8')
 
 logger = logging.getLogger(__name__)
 
 # Constants
 FOOD_CACHE_FILE = "data/food_cache.json"
-CACHE_DURATION = timedelta(hours=12)
+FOOD_CACHE_PATH = Path(FOOD_CACHE_FILE)
+# How long a food suggestion is kept, in seconds
+CACHE_DURATION = 12 * 60 * 60
+# Telegram has a message limit, so long food lists are split into chunks
+FOODLIST_CHUNK_SIZE = 4000
+# Food lists larger than this (in bytes) are memory-mapped instead of read
+FOOD_LIST_MMAP_THRESHOLD = 64 * 1024
+# Non-empty lines of a memory-mapped food list
+_LINE_PATTERN = re.compile(rb'[^\r\n]+')
 # List of restricted usernames - users in this list will receive a VIP message
 # when attempting to use any bot commands
 RESTRICTED_USERS = ["phuongtung99"]
+# Lowercased restricted usernames for case-insensitive lookups
+_RESTRICTED_LOWER = frozenset(user.lower() for user in RESTRICTED_USERS)
+
+# Open SQLite connections to debt databases keyed by path
+_debt_connections: Dict[str, sqlite3.Connection] = {}
+
+# Insert new users or add to the existing debt in a single statement
+_ADD_DEBT_SQL = (
+    "INSERT INTO debts(username, amount) VALUES(?, ?) "
+    "ON CONFLICT(username) DO UPDATE SET amount = amount + excluded.amount"
+)
+_GET_DEBT_SQL = "SELECT amount FROM debts WHERE username = ?"
+
+# user_version of a debt database that has imported the legacy JSON file
+_DEBTS_MIGRATED_VERSION = 1
+
+# Parsed food lists keyed by absolute path, stored as (mtime_ns, foods, casefolded foods)
+_food_list_cache: Dict[str, Tuple[int, List[str], Set[str]]] = {}
+
+# Ready-to-send /foodlist messages keyed by absolute path, stored as (mtime_ns, messages)
+_foodlist_messages_cache: Dict[str, Tuple[Optional[int], List[str]]] = {}
+
+# Directories already created by _ensure_dir
+_ensured_dirs: Set[str] = set()
+
+# Current food suggestion held in memory as (food, time.monotonic() expiry); the
+# JSON file is only read at startup so suggestions survive restarts
+_food_cache_mem: Optional[Tuple[str, float]] = None
+
+def _abs_path(file_path: str) -> str:
+    """
+    Convert a path to an absolute path if it's relative.
+    Absolute paths are returned as-is, which avoids an os.getcwd() call.
+    
+    Args:
+        file_path: Path to convert
+        
+    Returns:
+        Absolute path
+    """
+    if os.path.isabs(file_path):
+        return file_path
+    return os.path.abspath(file_path)
+
+
+def _ensure_dir(file_path: Union[str, Path]) -> None:
+    """
+    Create the directory containing a file if it doesn't exist.
+    Each directory is only checked once per process.
+    
+    Args:
+        file_path: Path to a file whose directory should exist
+    """
+    directory = os.path.dirname(file_path)
+    if directory and directory not in _ensured_dirs:
+        os.makedirs(directory, exist_ok=True)
+        _ensured_dirs.add(directory)
+
+
+def _atomic_write(file_path: Union[str, Path], data: bytes) -> None:
+    """
+    Write data to a file so readers see either the old or the new content.
+    The data goes to a temporary file first, which is flushed to disk and then
+    replaces the target, so a crash never leaves a partially written file.
+    
+    Args:
+        file_path: Path to the file to write
+        data: Bytes to write
+    """
+    tmp_path = os.fspath(file_path) + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+
 
 def load_food_cache() -> Dict:
     """
@@ -21,37 +127,73 @@ def load_food_cache() -> Dict:
     Returns:
         Dictionary containing the cached food and timestamp
     """
-    if not os.path.exists(FOOD_CACHE_FILE):
-        return {}
-    
+    # Just try to open it; a missing file is handled below
     try:
-        with open(FOOD_CACHE_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
+        with open(FOOD_CACHE_PATH, 'rb') as f:
+            return _json_loads(f.read())
+    except (ValueError, FileNotFoundError):
         return {}
 
-def save_food_cache(food: str) -> None:
+def save_food_cache(food: str, timestamp: Optional[float] = None) -> None:
     """
-    Save the current food and timestamp to cache.
+    Save the current food and timestamp to cache, both in memory and on disk.
     
     Args:
         food: The food to cache
+        timestamp: When the food was selected as a Unix timestamp, defaults to now
     """
+    global _food_cache_mem
+    
+    # Expire on the monotonic clock so wall-clock changes can't extend or cut it
+    if timestamp is None:
+        timestamp = time.time()
+        remaining = CACHE_DURATION
+    else:
+        remaining = CACHE_DURATION - (time.time() - timestamp)
+    _food_cache_mem = (food, time.monotonic() + remaining)
+    
     cache_data = {
         'food': food,
-        'timestamp': datetime.now().isoformat()
+        'timestamp': timestamp
     }
     
     # Create directory if it doesn't exist
-    os.makedirs(os.path.dirname(FOOD_CACHE_FILE), exist_ok=True)
+    _ensure_dir(FOOD_CACHE_PATH)
     
-    with open(FOOD_CACHE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(cache_data, f, indent=2)
+    _atomic_write(FOOD_CACHE_PATH, _json_dumps(cache_data))
+
+def _restore_food_cache() -> None:
+    """
+    Load the food suggestion saved by a previous run into memory.
+    """
+    global _food_cache_mem
+    
+    cache = load_food_cache()
+    if not cache:
+        return
+    
+    # A damaged cache file must not stop the bot from starting; treat it as empty
+    try:
+        food = cache['food']
+        timestamp = cache['timestamp']
+        # Older caches stored an ISO string; convert and rewrite them once
+        if isinstance(timestamp, str):
+            save_food_cache(food, datetime.fromisoformat(timestamp).timestamp())
+        else:
+            remaining = CACHE_DURATION - (time.time() - timestamp)
+            _food_cache_mem = (food, time.monotonic() + remaining)
+    except (KeyError, TypeError, ValueError) as e:
+        logger.warning(f"Ignoring invalid food cache file: {str(e)}")
+        _food_cache_mem = None
+
+_restore_food_cache()
 
 def load_food_list(file_path: str) -> List[str]:
     """
     Load the list of foods from a text file.
     Each food item should be on a new line.
+    The parsed list is cached and only re-read when the file's mtime changes,
+    so callers must not modify the returned list.
     
     Args:
         file_path: Path to the food list file
@@ -59,36 +201,108 @@ def load_food_list(file_path: str) -> List[str]:
     Returns:
         List of food items
     """
-    # Convert to absolute path if it's relative
-    abs_path = os.path.abspath(file_path)
-    logger.info(f"Loading food list from: {abs_path}")
-    logger.info(f"File exists: {os.path.exists(abs_path)}")
+    abs_path = _abs_path(file_path)
     
-    if not os.path.exists(abs_path):
+    try:
+        stat = os.stat(abs_path)
+    except FileNotFoundError:
         logger.warning(f"Food list file not found at: {abs_path}")
+        _food_list_cache.pop(abs_path, None)
         return []
+    mtime = stat.st_mtime_ns
     
+    # Reuse the parsed list as long as the file hasn't changed on disk
+    cached = _food_list_cache.get(abs_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    
+    logger.debug("Loading food list from: %s", abs_path)
     try:
-        with open(abs_path, 'r', encoding='utf-8') as f:
-            # Strip whitespace and filter out empty lines
-            foods = [line.strip() for line in f if line.strip()]
-            logger.info(f"Loaded {len(foods)} foods from list")
-            return foods
+        if stat.st_size > FOOD_LIST_MMAP_THRESHOLD:
+            # Map large files straight from the page cache instead of copying them in.
+            # Lines end at \n, \r or \r\n, the same as bytes.splitlines() below
+            with open(abs_path, 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # Only copy the stripped lines out here; a live finditer() holds a buffer
+                # export on the mapping, so decoding (which may raise) waits until it's closed
+                lines = [m.group().strip() for m in _LINE_PATTERN.finditer(mm)]
+        else:
+            # Read the whole file in one call and split it ourselves
+            with open(abs_path, 'rb') as f:
+                data = f.read()
+            lines = [raw.strip() for raw in data.splitlines()]
+        # Empty lines are skipped as bytes so only real foods get decoded. bytes.strip()
+        # only knows ASCII whitespace, so lines with other bytes are stripped again as
+        # text, the same way user input is, to catch things like a trailing NBSP
+        foods = []
+        for line in lines:
+            if not line:
+                continue
+            if line.isascii():
+                foods.append(line.decode('utf-8'))
+            else:
+                food = line.decode('utf-8').strip()
+                if food:
+                    foods.append(food)
+        logger.debug("Loaded %d foods from list", len(foods))
     except Exception as e:
         logger.error(f"Error loading food list: {str(e)}")
+        _food_list_cache.pop(abs_path, None)
         return []
+    
+    _food_list_cache[abs_path] = (mtime, foods, {food.casefold() for food in foods})
+    return foods
+
+
+def _load_food_list_and_set(file_path: str) -> Optional[Tuple[List[str], Set[str]]]:
+    """
+    Load the food list together with its casefolded foods for O(1) membership checks.
+    
+    Args:
+        file_path: Path to the food list file
+        
+    Returns:
+        Tuple of (list of food items, set of casefolded food items), empty if the
+        file doesn't exist yet, or None if the file exists but couldn't be read
+    """
+    abs_path = _abs_path(file_path)
+    load_food_list(abs_path)
+    cached = _food_list_cache.get(abs_path)
+    if cached:
+        return cached[1], cached[2]
+    if os.path.exists(abs_path):
+        return None
+    return [], set()
+
+
+def _update_food_list_cache(file_path: str, foods: List[str], food_set: Set[str]) -> None:
+    """
+    Store a food list that was just written to disk, so it isn't read back.
+    Ready-made /foodlist messages for the file are dropped.
+    
+    Args:
+        file_path: Path to the food list file
+        foods: The food items now in the file
+        food_set: The casefolded food items now in the file
+    """
+    abs_path = _abs_path(file_path)
+    _food_list_cache[abs_path] = (os.stat(abs_path).st_mtime_ns, foods, food_set)
+    _foodlist_messages_cache.pop(abs_path, None)
 
 
 def clear_food_cache() -> None:
     """
     Clear the cached food suggestion by removing the cache file.
     """
-    if os.path.exists(FOOD_CACHE_FILE):
-        try:
-            os.remove(FOOD_CACHE_FILE)
-            logger.info("Food cache cleared successfully")
-        except Exception as e:
-            logger.error(f"Error clearing food cache: {str(e)}")
+    global _food_cache_mem
+    _food_cache_mem = None
+    
+    try:
+        # A single unlink; a missing file just means there was nothing to clear
+        FOOD_CACHE_PATH.unlink(missing_ok=True)
+        logger.info("Food cache cleared successfully")
+    except Exception as e:
+        logger.error(f"Error clearing food cache: {str(e)}")
 
 def get_random_food(file_path: str, force_new: bool = False) -> Optional[str]:
     """
@@ -103,17 +317,10 @@ def get_random_food(file_path: str, force_new: bool = False) -> Optional[str]:
     Returns:
         Random food item or None if the list is empty
     """
-    # Check cache first (unless force_new is True)
-    if not force_new:
-        cache = load_food_cache()
-        now = datetime.now()
-        
-        if cache:
-            cached_time = datetime.fromisoformat(cache['timestamp'])
-            # If cache is still valid (less than 12 hours old)
-            if now - cached_time < CACHE_DURATION:
-                logger.info(f"Returning cached food: {cache['food']}")
-                return cache['food']
+    # Check cache first (unless force_new is True), if it's still valid
+    if not force_new and _food_cache_mem and time.monotonic() < _food_cache_mem[1]:
+        logger.debug("Returning cached food: %s", _food_cache_mem[0])
+        return _food_cache_mem[0]
     
     # If we get here, either cache is empty/expired or force_new is True
     foods = load_food_list(file_path)
@@ -121,8 +328,8 @@ def get_random_food(file_path: str, force_new: bool = False) -> Optional[str]:
         return None
     
     # Select new random food
-    food = random.choice(foods)
-    logger.info(f"Selected new random food: {food}")
+    food = foods[random.randrange(len(foods))]
+    logger.debug("Selected new random food: %s", food)
     
     # Save to cache
     save_food_cache(food)
@@ -130,41 +337,86 @@ def get_random_food(file_path: str, force_new: bool = False) -> Optional[str]:
     return food
 
 
-def load_debts(file_path: str) -> Dict[str, float]:
+def _get_conn(file_path: str) -> sqlite3.Connection:
     """
-    Load user debts from JSON file.
+    Get the cached SQLite connection for a debt database, creating it on first use.
     
     Args:
         file_path: Path to the debt database file
         
     Returns:
-        Dictionary mapping usernames to debt amounts
+        Open connection in autocommit mode with the debts table created
     """
-    if not os.path.exists(file_path):
-        # Create the directory if it doesn't exist
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        return {}
+    conn = _debt_connections.get(file_path)
+    if conn is not None:
+        return conn
     
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return {}
+    # Create the directory if it doesn't exist
+    _ensure_dir(file_path)
+    
+    conn = sqlite3.connect(file_path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS debts ("
+        "username TEXT PRIMARY KEY, "
+        "amount REAL NOT NULL DEFAULT 0)"
+    )
+    _debt_connections[file_path] = conn
+    return conn
 
 
-def save_debts(debts: Dict[str, float], file_path: str) -> None:
+def migrate_debts_from_json(json_path: str, file_path: str) -> int:
     """
-    Save user debts to JSON file.
+    Import debts from the legacy JSON file into the debt database.
+    The import is recorded in the database's user_version, so it only happens
+    once and the JSON file is left untouched.
+    Users that already exist in the database keep their current debt.
     
     Args:
-        debts: Dictionary mapping usernames to debt amounts
+        json_path: Path to the legacy JSON debt file
         file_path: Path to the debt database file
+        
+    Returns:
+        Number of users imported
     """
-    # Create the directory if it doesn't exist
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    conn = _get_conn(file_path)
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= _DEBTS_MIGRATED_VERSION:
+        return 0
     
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(debts, f, indent=2)
+    try:
+        with open(json_path, 'rb') as f:
+            debts = _json_loads(f.read())
+    except FileNotFoundError:
+        return 0
+    except ValueError as e:
+        logger.error(f"Could not migrate debts from {json_path}: {str(e)}")
+        return 0
+    
+    if not isinstance(debts, dict):
+        logger.error(f"Could not migrate debts from {json_path}: expected a JSON object")
+        return 0
+    
+    # Skip entries that aren't a username with a numeric amount
+    rows = []
+    for username, amount in debts.items():
+        try:
+            rows.append((username, float(amount)))
+        except (TypeError, ValueError):
+            logger.warning(f"Skipping invalid debt for '{username}' in {json_path}: {amount!r}")
+    
+    with conn:
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT INTO debts(username, amount) VALUES(?, ?) "
+            "ON CONFLICT(username) DO NOTHING",
+            rows
+        )
+        # Mark the import as done in the same transaction as the rows themselves
+        conn.execute(f"PRAGMA user_version = {_DEBTS_MIGRATED_VERSION}")
+    
+    logger.info(f"Migrated {len(rows)} debts from {json_path} to {file_path}")
+    return len(rows)
 
 
 def add_debt(username: str, amount: float, file_path: str) -> float:
@@ -179,19 +431,34 @@ def add_debt(username: str, amount: float, file_path: str) -> float:
     Returns:
         New total debt for the user
     """
-    debts = load_debts(file_path)
+    conn = _get_conn(file_path)
+    conn.execute(_ADD_DEBT_SQL, (username, amount))
+    row = conn.execute(_GET_DEBT_SQL, (username,)).fetchone()
     
-    # Initialize debt for new users
-    if username not in debts:
-        debts[username] = 0
-    
-    # Add to existing debt
-    debts[username] += amount
-    
-    # Save updated debts
-    save_debts(debts, file_path)
+    return row[0]
+
+
+def add_debts_bulk(updates: List[Tuple[str, float]], file_path: str) -> Dict[str, float]:
+    """
+    Add debt to several users in a single transaction.
     
-    return debts[username]
+    Args:
+        updates: List of (username, amount) pairs to add
+        file_path: Path to the debt database file
+        
+    Returns:
+        Dictionary mapping each updated username to their new total debt
+    """
+    conn = _get_conn(file_path)
+    with conn:
+        conn.execute("BEGIN")
+        conn.executemany(_ADD_DEBT_SQL, updates)
+        totals = {
+            username: conn.execute(_GET_DEBT_SQL, (username,)).fetchone()[0]
+            for username, _ in updates
+        }
+    
+    return totals
 
 
 def get_debt(username: str, file_path: str) -> float:
@@ -205,8 +472,9 @@ def get_debt(username: str, file_path: str) -> float:
     Returns:
         Total debt for the user
     """
-    debts = load_debts(file_path)
-    return debts.get(username, 0)
+    conn = _get_conn(file_path)
+    row = conn.execute(_GET_DEBT_SQL, (username,)).fetchone()
+    return row[0] if row else 0
 
 
 def clear_debt(username: str, file_path: str) -> None:
@@ -217,11 +485,8 @@ def clear_debt(username: str, file_path: str) -> None:
         username: Username of the user
         file_path: Path to the debt database file
     """
-    debts = load_debts(file_path)
-    
-    if username in debts:
-        debts[username] = 0
-        save_debts(debts, file_path)
+    conn = _get_conn(file_path)
+    conn.execute("UPDATE debts SET amount = 0 WHERE username = ?", (username,))
 
 
 def add_food_to_list(food: str, file_path: str) -> bool:
@@ -237,19 +502,26 @@ def add_food_to_list(food: str, file_path: str) -> bool:
     """
     try:
         # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        _ensure_dir(file_path)
         
-        # Check if the food already exists in the list
-        existing_foods = load_food_list(file_path)
+        # Check if the food already exists in the list (case insensitive)
+        loaded = _load_food_list_and_set(file_path)
+        if loaded is None:
+            # Don't append to (and cache) a list we couldn't read
+            return False
+        existing_foods, existing_set = loaded
         food = food.strip()
         
-        if food in existing_foods:
+        if food.casefold() in existing_set:
             logger.info(f"Food '{food}' already exists in the list")
             return False
         
         # Append the new food to the file
         with open(file_path, 'a', encoding='utf-8') as f:
             f.write(f"\n{food}")
+        existing_foods.append(food)
+        existing_set.add(food.casefold())
+        _update_food_list_cache(file_path, existing_foods, existing_set)
         
         logger.info(f"Added new food '{food}' to the list")
         return True
@@ -273,21 +545,25 @@ def remove_food_from_list(food: str, file_path: str) -> Tuple[bool, str]:
     """
     try:
         # Load existing foods
-        existing_foods = load_food_list(file_path)
+        loaded = _load_food_list_and_set(file_path)
+        if loaded is None:
+            return False, "Could not read the food list"
+        existing_foods, food_set = loaded
         
         if not existing_foods:
             return False, "Food list is empty"
         
         food = food.strip()
-        # Case insensitive search
-        food_lower = food.lower()
+        # Case insensitive search, casefolding each food only once
+        target = food.casefold()
+        folded = [f.casefold() for f in existing_foods]
         
         # Find potential matches
-        matches = [f for f in existing_foods if f.lower() == food_lower]
+        match_indices = [i for i, f in enumerate(folded) if f == target]
         
-        if not matches:
+        if not match_indices:
             # Try to find if it's a partial match
-            partial_matches = [f for f in existing_foods if food_lower in f.lower()]
+            partial_matches = [existing_foods[i] for i, f in enumerate(folded) if target in f]
             if partial_matches:
                 # Return the matches so the user can be more specific
                 match_str = ", ".join([f"'{m}'" for m in partial_matches[:5]])
@@ -295,17 +571,20 @@ def remove_food_from_list(food: str, file_path: str) -> Tuple[bool, str]:
                        (f" (and {len(partial_matches) - 5} more)" if len(partial_matches) > 5 else "")
             return False, f"Food '{food}' not found in the list"
         
+        matches = [existing_foods[i] for i in match_indices]
+        
         # Remove the exact match
-        updated_foods = [f for f in existing_foods if f.lower() != food_lower]
+        removed = set(match_indices)
+        updated_foods = [f for i, f in enumerate(existing_foods) if i not in removed]
         
-        # Write back to file
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write("\n".join(updated_foods))
+        # Write back to file, replacing it atomically so readers never see it half-written
+        _ensure_dir(file_path)
+        _atomic_write(file_path, "\n".join(updated_foods).encode('utf-8'))
+        food_set.discard(target)
+        _update_food_list_cache(file_path, updated_foods, food_set)
         
         # If we've removed the current food cache, clear it
-        cache = load_food_cache()
-        if cache and any(match.lower() == cache.get('food', '').lower() for match in matches):
+        if _food_cache_mem and _food_cache_mem[0].casefold() == target:
             clear_food_cache()
             logger.info(f"Cleared food cache as removed food was currently cached")
         
@@ -336,12 +615,12 @@ def get_all_foods(file_path: str, numbered: bool = False) -> Tuple[List[str], st
     if not foods:
         return [], "No foods available in the list."
     
-    # Sort alphabetically for better readability
-    foods.sort()
+    # Sort alphabetically for better readability (copy, the loaded list is cached)
+    foods = sorted(foods)
     
     if numbered:
         # Create a numbered list
-        formatted_text = "\n".join([f"{i+1}. {food}" for i, food in enumerate(foods)])
+        formatted_text = "\n".join([f"{i}. {food}" for i, food in enumerate(foods, 1)])
     else:
         # Create a bullet list
         formatted_text = "\n".join([f"• {food}" for food in foods])
@@ -349,6 +628,42 @@ def get_all_foods(file_path: str, numbered: bool = False) -> Tuple[List[str], st
     return foods, formatted_text
 
 
+def get_foodlist_messages(file_path: str) -> List[str]:
+    """
+    Get the numbered food list split into messages that fit Telegram's limit.
+    The messages are cached until the food list file changes.
+    
+    Args:
+        file_path: Path to the food list file
+        
+    Returns:
+        List of messages to send, the first one including the header
+    """
+    abs_path = _abs_path(file_path)
+    try:
+        mtime = os.stat(abs_path).st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+    
+    cached = _foodlist_messages_cache.get(abs_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    
+    _, formatted_text = get_all_foods(abs_path, numbered=True)
+    
+    if len(formatted_text) > FOODLIST_CHUNK_SIZE:
+        # Slice each message straight out of the text, the first one with the header
+        total = -(-len(formatted_text) // FOODLIST_CHUNK_SIZE)
+        messages = [formatted_text[i*FOODLIST_CHUNK_SIZE:(i+1)*FOODLIST_CHUNK_SIZE]
+                    for i in range(total)]
+        messages[0] = f"🍽️ Food List (Part 1/{total}):\n\n{messages[0]}"
+    else:
+        messages = [f"🍽️ Food List:\n\n{formatted_text}"]
+    
+    _foodlist_messages_cache[abs_path] = (mtime, messages)
+    return messages
+
+
 def is_restricted_user(username: str) -> bool:
     """
     Check if a username is in the restricted list.
@@ -360,25 +675,14 @@ def is_restricted_user(username: str) -> bool:
         True if the user is restricted, False otherwise
     """
     # Remove @ symbol if present
-    if username.startswith('@'):
-        username = username[1:]
+    username = username.removeprefix('@')
     
     # Convert to lowercase for case-insensitive comparison
     username_lower = username.lower()
     
-    # Log the check
-    logger.info(f"Checking if user '{username}' is in restricted list: {RESTRICTED_USERS}")
-    logger.info(f"Lowercase username for comparison: '{username_lower}'")
-    
-    # Log each individual comparison
-    for restricted_user in RESTRICTED_USERS:
-        restricted_user_lower = restricted_user.lower()
-        is_match = username_lower == restricted_user_lower
-        logger.info(f"Comparing '{username_lower}' with restricted user '{restricted_user_lower}': Match = {is_match}")
-    
-    # Check against the restricted usernames list
-    result = username_lower in [user.lower() for user in RESTRICTED_USERS]
-    logger.info(f"Final result of restriction check for '{username}': {result}")
+    # Check against the precomputed set of restricted usernames
+    result = username_lower in _RESTRICTED_LOWER
+    logger.debug("Final result of restriction check for '%s': %s", username, result)
     return result
 
 
@@ -394,10 +698,10 @@ async def check_command_restriction(update, username: str) -> bool:
     Returns:
         True if the user is restricted, False otherwise
     """
-    logger.info(f"Checking command restriction for user: {username}")
-    if is_restricted_user(username):
-        logger.info(f"User {username} is restricted, sending VIP message")
-        await update.message.reply_text("Bạn cần nạp VIP để thực hiện lệnh này")
-        return True
-    logger.info(f"User {username} is not restricted")
-    return False 
\ No newline at end of file
+    # Common case: nothing to await, return straight away
+    if not is_restricted_user(username):
+        return False
+    
+    logger.info("User %s is restricted, sending VIP message", username)
+    await update.message.reply_text("Bạn cần nạp VIP để thực hiện lệnh này")
+    return True 
\ No newline at end of file